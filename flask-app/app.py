@@ -1,178 +1,401 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, abort, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+from flask_caching import Cache
+from werkzeug.routing import IntegerConverter, ValidationError
+import hashlib
+import itertools
 import os
 import json
+import atexit
 import logging
-from datetime import datetime
+import logging.handlers
+import orjson
+import queue
+import re
+import sys
+import threading
+import time
+import traceback
 
-# Configure logging
+class BatchWriteListener(logging.handlers.QueueListener):
+    """QueueListener that drains every pending record and writes the batch
+    with a single writev() call instead of one write() per record"""
+
+    # Upper bound on records per writev(), well under IOV_MAX
+    max_batch = 256
+
+    def __init__(self, queue, fd, formatter):
+        super().__init__(queue)
+        self.fd = fd
+        self.formatter = formatter
+
+    def _monitor(self):
+        while True:
+            record = self.dequeue(True)
+            buffers = []
+            while record is not self._sentinel:
+                try:
+                    buffers.append((self.formatter.format(record) + '\n').encode())
+                except Exception:
+                    self.report_error(f"Message: {record.msg!r}\nArguments: {record.args}")
+                if len(buffers) >= self.max_batch:
+                    break
+                try:
+                    record = self.dequeue(False)
+                except queue.Empty:
+                    break
+            if buffers:
+                self.write_batch(buffers)
+            if record is self._sentinel:
+                break
+
+    def write_batch(self, buffers):
+        try:
+            written = os.writev(self.fd, buffers)
+            if written < sum(map(len, buffers)):
+                # Short write: finish the remainder with plain write() calls
+                data = b''.join(buffers)[written:]
+                while data:
+                    data = data[os.write(self.fd, data):]
+        except Exception:
+            self.report_error(f"Failed writing a batch of {len(buffers)} log records")
+
+    def report_error(self, message):
+        """Report a failure on sys.stderr the way Handler.handleError does,
+        without stopping the listener thread"""
+        if logging.raiseExceptions and sys.stderr:
+            try:
+                sys.stderr.write(f"--- Logging error ---\n{message}\n")
+                traceback.print_exc(file=sys.stderr)
+            except Exception:
+                pass
+
+
+# Configure logging: request handlers only enqueue records, a background
+# listener thread formats them and writes them to stderr in batches
+log_queue = queue.SimpleQueue()
+log_listener = BatchWriteListener(
+    log_queue,
+    fd=2,
+    formatter=logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+)
+queue_handler = logging.handlers.QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter('%(message)s'))
 logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+    level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+    handlers=[queue_handler]
 )
+log_listener.start()
+atexit.register(log_listener.stop)
 logger = logging.getLogger(__name__)
 
+
+# Formatted UTC timestamp, recomputed at most once per second
+_cached_ts_sec = 0
+_cached_ts_str = ""
+
+def iso_now():
+    """Return the current UTC time as an ISO 8601 string with second precision"""
+    global _cached_ts_sec, _cached_ts_str
+    sec = int(time.time())
+    if sec != _cached_ts_sec:
+        _cached_ts_str = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(sec))
+        _cached_ts_sec = sec
+    return _cached_ts_str
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that parses requests and serializes responses with orjson"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS),
+            mimetype=self.mimetype
+        )
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # Configuration
 app.config['DEBUG'] = os.getenv('FLASK_DEBUG', 'False').lower() in ['true', '1', 't']
 app.config['HOST'] = os.getenv('FLASK_HOST', '0.0.0.0')
 app.config['PORT'] = int(os.getenv('FLASK_PORT', 5000))
 
-# In-memory storage for demo purposes
-tasks = [
-    {
+# Per-process response cache for task reads, keyed by store generation
+cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache'})
+
+# In-memory storage for demo purposes, indexed by task ID
+_seed_tasks = {
+    1: {
         "id": 1,
         "title": "Learn Docker",
         "description": "Understand containerization",
         "completed": False,
         "created_at": "2024-01-01T00:00:00Z"
     },
-    {
+    2: {
         "id": 2,
         "title": "Learn Kubernetes",
         "description": "Master container orchestration",
         "completed": False,
         "created_at": "2024-01-02T00:00:00Z"
     }
-]
+}
+# Store state: (tasks by ID, frozenset of completed task IDs, generation).
+# The completed index keeps /metrics and completion filters from scanning the
+# tasks; the generation is bumped by every write and keys the response cache.
+# Writers serialize on _write_lock and publish a new tuple in one assignment;
+# nothing reachable from a published tuple is mutated afterwards, so readers
+# unpack _state once and get a consistent snapshot without locking
+_state = (
+    _seed_tasks,
+    frozenset(task_id for task_id, task in _seed_tasks.items() if task["completed"]),
+    0
+)
+_write_lock = threading.Lock()
+# Task ID allocator; only advanced under _write_lock so IDs stay in insertion order
+_id_gen = itertools.count(max(_seed_tasks) + 1)
+
+
+class TaskIdConverter(IntegerConverter):
+    """Integer converter that only matches IDs of existing tasks, so unknown
+    IDs are rejected by the router with a 404 before any view runs.
+
+    Only used on the GET route: Werkzeug validates converters after picking
+    a rule, so on a shared URL a PUT/DELETE miss would surface as a 405."""
+
+    def to_python(self, value):
+        task_id = int(value)
+        if task_id not in _state[0]:
+            raise ValidationError()
+        return task_id
+
+
+app.url_map.converters['tid'] = TaskIdConverter
+
+# Paths the task-ID routes would match apart from the ID lookup
+_TASK_PATH = re.compile(r'/tasks/\d+')
+
+# Static parts of the home/probe responses, serialized once at import time.
+# The home body is a bytes %-template with the environment baked in and a
+# single placeholder for the per-request timestamp.
+_HOME_TMPL = orjson.dumps({
+    "message": "Flask App Running on EKS!",
+    "version": "1.0.0",
+    "environment": os.getenv('ENVIRONMENT', 'development'),
+    "kubernetes_info": {
+        "pod_name": os.getenv('HOSTNAME', 'unknown'),
+        "namespace": os.getenv('POD_NAMESPACE', 'default'),
+        "node_name": os.getenv('NODE_NAME', 'unknown')
+    },
+    "timestamp": "__TS__"
+}).replace(b'%', b'%%').replace(b'"__TS__"', b'"%s"')
+_HEALTH_PAYLOAD = {"status": "healthy", "uptime": "Service is running"}
+_READY_PAYLOAD = {"status": "ready"}
+
+# Probe bodies are reused for up to this many seconds
+_PROBE_TTL = 1.0
+_probe_cache = {}
+
+def _cached_probe(name, payload):
+    """Return the serialized probe body, refreshing its timestamp once per TTL"""
+    now = time.monotonic()
+    cached = _probe_cache.get(name)
+    if cached is None or now - cached[0] >= _PROBE_TTL:
+        body = orjson.dumps(dict(payload, timestamp=iso_now()))
+        cached = _probe_cache[name] = (now, body)
+    return cached[1]
 
 @app.route('/')
 def home():
     """Home endpoint"""
-    return jsonify({
-        "message": "Flask App Running on EKS!",
-        "version": "1.0.0",
-        "timestamp": datetime.utcnow().isoformat() + "Z",
-        "environment": os.getenv('ENVIRONMENT', 'development'),
-        "kubernetes_info": {
-            "pod_name": os.getenv('HOSTNAME', 'unknown'),
-            "namespace": os.getenv('POD_NAMESPACE', 'default'),
-            "node_name": os.getenv('NODE_NAME', 'unknown')
-        }
-    })
+    return Response(_HOME_TMPL % iso_now().encode(), mimetype='application/json')
 
 @app.route('/health')
 def health():
     """Health check endpoint"""
-    return jsonify({
-        "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat() + "Z",
-        "uptime": "Service is running"
-    }), 200
+    return Response(_cached_probe('health', _HEALTH_PAYLOAD), mimetype='application/json'), 200
 
 @app.route('/ready')
 def ready():
     """Readiness check endpoint"""
-    return jsonify({
-        "status": "ready",
-        "timestamp": datetime.utcnow().isoformat() + "Z"
-    }), 200
+    return Response(_cached_probe('ready', _READY_PAYLOAD), mimetype='application/json'), 200
+
+_FAST_PROBES = {
+    '/health': ('health', _HEALTH_PAYLOAD),
+    '/ready': ('ready', _READY_PAYLOAD)
+}
+
+def fast_probe_middleware(wsgi_app):
+    """Answer GET /health and /ready from the cached probe bodies before
+    Flask's routing, request context and view dispatch run"""
+    def middleware(environ, start_response):
+        probe = _FAST_PROBES.get(environ.get('PATH_INFO'))
+        if probe is None or environ.get('REQUEST_METHOD') != 'GET':
+            return wsgi_app(environ, start_response)
+        body = _cached_probe(*probe)
+        start_response('200 OK', [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(body)))
+        ])
+        return [body]
+    return middleware
+
+app.wsgi_app = fast_probe_middleware(app.wsgi_app)
+
+# Cached task reads are keyed by the store generation current when the request
+# started. A view may read a newer state than its key names, but never an
+# older one, and writers bump the generation, so entries are never stale.
+def _tasks_cache_key():
+    return f"tasks/{_state[2]}"
+
+def _task_cache_key():
+    return f"task/{_state[2]}/{request.view_args['task_id']}"
 
 @app.route('/tasks', methods=['GET'])
+@cache.cached(timeout=5, key_prefix=_tasks_cache_key, unless=lambda: bool(request.args))
 def get_tasks():
-    """Get all tasks"""
+    """Get all tasks, optionally filtered with ?completed=true|false"""
     logger.info("Fetching all tasks")
+    tasks_by_id, completed_ids, _ = _state
+    completed = request.args.get('completed')
+    if completed is None:
+        tasks = list(tasks_by_id.values())
+    elif completed.lower() in ['true', '1', 't']:
+        tasks = [tasks_by_id[task_id] for task_id in sorted(completed_ids)]
+    elif completed.lower() in ['false', '0', 'f']:
+        tasks = [task for task_id, task in tasks_by_id.items() if task_id not in completed_ids]
+    else:
+        return jsonify({"error": "completed must be true or false"}), 400
     return jsonify({
         "tasks": tasks,
         "count": len(tasks)
     })
 
-@app.route('/tasks/<int:task_id>', methods=['GET'])
+@app.route('/tasks/<tid:task_id>', methods=['GET'])
+@cache.cached(timeout=5, key_prefix=_task_cache_key)
 def get_task(task_id):
     """Get a specific task"""
-    logger.info(f"Fetching task with ID: {task_id}")
-    task = next((task for task in tasks if task["id"] == task_id), None)
-    if task:
-        return jsonify(task)
-    else:
-        return jsonify({"error": "Task not found"}), 404
+    logger.info("Fetching task with ID: %s", task_id)
+    task = _state[0].get(task_id)
+    if task is None:
+        # Deleted by another request after routing
+        abort(404)
+    return jsonify(task)
 
 @app.route('/tasks', methods=['POST'])
 def create_task():
     """Create a new task"""
-    try:
-        data = request.get_json()
-        if not data or 'title' not in data:
-            return jsonify({"error": "Title is required"}), 400
-        
+    global _state
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or 'title' not in data:
+        return jsonify({"error": "Title is required"}), 400
+    
+    with _write_lock:
         new_task = {
-            "id": max([task["id"] for task in tasks], default=0) + 1,
+            "id": next(_id_gen),
             "title": data["title"],
             "description": data.get("description", ""),
             "completed": False,
-            "created_at": datetime.utcnow().isoformat() + "Z"
+            "created_at": iso_now()
         }
-        
-        tasks.append(new_task)
-        logger.info(f"Created new task: {new_task['id']}")
-        return jsonify(new_task), 201
-    
-    except Exception as e:
-        logger.error(f"Error creating task: {str(e)}")
-        return jsonify({"error": "Internal server error"}), 500
+        tasks_by_id, completed_ids, generation = _state
+        tasks = dict(tasks_by_id)
+        tasks[new_task['id']] = new_task
+        _state = (tasks, completed_ids, generation + 1)
+    logger.info("Created new task: %s", new_task['id'])
+    return jsonify(new_task), 201
 
 @app.route('/tasks/<int:task_id>', methods=['PUT'])
 def update_task(task_id):
     """Update a task"""
-    try:
-        task = next((task for task in tasks if task["id"] == task_id), None)
+    global _state
+    if task_id not in _state[0]:
+        return jsonify({"error": "Task not found"}), 404
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data:
+        return jsonify({"error": "No data provided"}), 400
+    
+    with _write_lock:
+        tasks_by_id, completed_ids, generation = _state
+        task = tasks_by_id.get(task_id)
         if not task:
             return jsonify({"error": "Task not found"}), 404
-        
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-        
-        task["title"] = data.get("title", task["title"])
-        task["description"] = data.get("description", task["description"])
-        task["completed"] = data.get("completed", task["completed"])
-        
-        logger.info(f"Updated task: {task_id}")
-        return jsonify(task)
+        task = dict(
+            task,
+            title=data.get("title", task["title"]),
+            description=data.get("description", task["description"]),
+            completed=data.get("completed", task["completed"])
+        )
+        tasks = dict(tasks_by_id)
+        tasks[task_id] = task
+        if task["completed"]:
+            completed_ids = completed_ids | {task_id}
+        else:
+            completed_ids = completed_ids - {task_id}
+        _state = (tasks, completed_ids, generation + 1)
     
-    except Exception as e:
-        logger.error(f"Error updating task {task_id}: {str(e)}")
-        return jsonify({"error": "Internal server error"}), 500
+    logger.info("Updated task: %s", task_id)
+    return jsonify(task)
 
 @app.route('/tasks/<int:task_id>', methods=['DELETE'])
 def delete_task(task_id):
     """Delete a task"""
-    try:
-        global tasks
-        task = next((task for task in tasks if task["id"] == task_id), None)
-        if not task:
+    global _state
+    with _write_lock:
+        tasks_by_id, completed_ids, generation = _state
+        if task_id not in tasks_by_id:
             return jsonify({"error": "Task not found"}), 404
-        
-        tasks = [task for task in tasks if task["id"] != task_id]
-        logger.info(f"Deleted task: {task_id}")
-        return jsonify({"message": f"Task {task_id} deleted successfully"})
-    
-    except Exception as e:
-        logger.error(f"Error deleting task {task_id}: {str(e)}")
-        return jsonify({"error": "Internal server error"}), 500
+        tasks = dict(tasks_by_id)
+        del tasks[task_id]
+        _state = (tasks, completed_ids - {task_id}, generation + 1)
+    logger.info("Deleted task: %s", task_id)
+    return jsonify({"message": f"Task {task_id} deleted successfully"})
 
 @app.route('/metrics')
 def metrics():
     """Basic metrics endpoint"""
+    tasks_by_id, completed_ids, _ = _state
+    total, completed = len(tasks_by_id), len(completed_ids)
     return jsonify({
-        "total_tasks": len(tasks),
-        "completed_tasks": len([task for task in tasks if task["completed"]]),
-        "pending_tasks": len([task for task in tasks if not task["completed"]]),
-        "timestamp": datetime.utcnow().isoformat() + "Z"
+        "total_tasks": total,
+        "completed_tasks": completed,
+        "pending_tasks": total - completed,
+        "timestamp": iso_now()
     })
 
+@app.after_request
+def add_etag(response):
+    """Tag successful GET/HEAD responses so repeat clients can get a 304"""
+    if request.method in ('GET', 'HEAD') and response.status_code == 200:
+        response.set_etag(hashlib.blake2b(response.get_data(), digest_size=8).hexdigest())
+        response.make_conditional(request)
+    return response
+
 @app.errorhandler(404)
 def not_found(error):
+    if _TASK_PATH.fullmatch(request.path):
+        return jsonify({"error": "Task not found"}), 404
     return jsonify({"error": "Endpoint not found"}), 404
 
 @app.errorhandler(500)
 def internal_error(error):
-    logger.error(f"Internal server error: {str(error)}")
+    logger.error("Internal server error: %s", error)
     return jsonify({"error": "Internal server error"}), 500
 
 if __name__ == '__main__':
-    logger.info(f"Starting Flask app on {app.config['HOST']}:{app.config['PORT']}")
-    logger.info(f"Debug mode: {app.config['DEBUG']}")
+    # Development server only; production runs under `gunicorn -c gunicorn.conf.py app:app`
+    logger.info("Starting Flask app on %s:%s", app.config['HOST'], app.config['PORT'])
+    logger.info("Debug mode: %s", app.config['DEBUG'])
     app.run(
         host=app.config['HOST'],
         port=app.config['PORT'],
@@ -0,0 +1,22 @@
+import os
+
+# Server socket; on Kubernetes this is a unix socket behind the nginx sidecar
+bind = os.getenv('GUNICORN_BIND', f"{os.getenv('FLASK_HOST', '0.0.0.0')}:{os.getenv('FLASK_PORT', '5000')}")
+keepalive = 5
+
+# Worker processes: each process keeps its own in-memory task store and
+# response cache, so default to one and let gthread threads provide the
+# concurrency; only raise GUNICORN_WORKERS once the store is shared
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+timeout = 120
+# Keep worker heartbeat files in memory so a slow disk can't stall the
+# worker's I/O loop; hosts without /dev/shm (e.g. macOS) use the default
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+# Logging: access log on stdout by default; set GUNICORN_ACCESSLOG to an
+# empty string to turn it off (Kubernetes logs access at the nginx sidecar)
+accesslog = os.getenv('GUNICORN_ACCESSLOG', '-') or None
+errorlog = '-'
@@ -0,0 +1,24 @@
+"""Exec probe that checks Gunicorn directly over its unix socket, bypassing
+the nginx sidecar, so container liveness reflects Gunicorn itself.
+
+Usage: python probe.py [path]
+"""
+import os
+import socket
+import sys
+
+
+def main(path='/health'):
+    bind = os.getenv('GUNICORN_BIND', '')
+    if not bind.startswith('unix:'):
+        sys.exit(f"GUNICORN_BIND is not a unix socket: {bind!r}")
+    with socket.socket(socket.AF_UNIX) as sock:
+        sock.settimeout(3)
+        sock.connect(bind[len('unix:'):])
+        sock.sendall(f"GET {path} HTTP/1.0\r\nHost: localhost\r\n\r\n".encode())
+        status_line = sock.recv(64).split(b' ', 2)
+    sys.exit(0 if len(status_line) > 1 and status_line[1] == b'200' else 1)
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -1,29 +1,49 @@
 import pytest
+import itertools
 import json
-from app import app
+import logging
+import orjson
+import os
+import queue
+import threading
+import time
+import app as app_module
+from app import app, BatchWriteListener
 
-@pytest.fixture
+@pytest.fixture(scope='session')
 def client():
     """Create test client"""
     app.config['TESTING'] = True
     with app.test_client() as client:
         yield client
 
+@pytest.fixture(autouse=True)
+def reset_tasks():
+    """Restore the task store after each test so tests don't leak state.
+    Writes are copy-on-write, so keeping references is enough."""
+    state = app_module._state
+    yield
+    app_module._state = state
+    app_module._id_gen = itertools.count(max(state[0]) + 1)
+    app_module.cache.clear()
+
 def test_home_endpoint(client):
     """Test home endpoint"""
     response = client.get('/')
     assert response.status_code == 200
-    data = json.loads(response.data)
+    data = orjson.loads(response.data)
     assert 'message' in data
     assert 'Flask App Running on EKS!' in data['message']
     assert 'version' in data
     assert 'timestamp' in data
+    assert 'pod_name' in data['kubernetes_info']
+    assert response.content_type == 'application/json'
 
 def test_health_endpoint(client):
     """Test health check endpoint"""
     response = client.get('/health')
     assert response.status_code == 200
-    data = json.loads(response.data)
+    data = orjson.loads(response.data)
     assert data['status'] == 'healthy'
     assert 'timestamp' in data
 
@@ -31,31 +51,84 @@ def test_ready_endpoint(client):
     """Test readiness check endpoint"""
     response = client.get('/ready')
     assert response.status_code == 200
-    data = json.loads(response.data)
+    data = orjson.loads(response.data)
     assert data['status'] == 'ready'
 
+def test_probes_skip_flask(client, monkeypatch):
+    """Test GET probes are answered by the middleware without reaching Flask"""
+    calls = []
+    for endpoint in ['health', 'ready']:
+        monkeypatch.setitem(app.view_functions, endpoint, lambda: calls.append(1) or ('', 500))
+    for path in ['/health', '/ready']:
+        response = client.get(path)
+        assert response.status_code == 200
+        assert 'ETag' not in response.headers
+    assert calls == []
+    assert 'ETag' in client.get('/metrics').headers
+
+def test_probe_head_request(client):
+    """Test probe endpoints still serve methods outside the fast path"""
+    response = client.head('/health')
+    assert response.status_code == 200
+    response = client.post('/ready')
+    assert response.status_code == 405
+
 def test_get_tasks(client):
     """Test get all tasks"""
     response = client.get('/tasks')
     assert response.status_code == 200
-    data = json.loads(response.data)
+    data = orjson.loads(response.data)
     assert 'tasks' in data
     assert 'count' in data
     assert isinstance(data['tasks'], list)
 
+def test_get_tasks_filtered_by_completion(client):
+    """Test filtering tasks by completion status"""
+    client.put('/tasks/1',
+               data=json.dumps({'completed': True}),
+               content_type='application/json')
+    data = orjson.loads(client.get('/tasks?completed=true').data)
+    assert [task['id'] for task in data['tasks']] == [1]
+    assert data['count'] == 1
+    data = orjson.loads(client.get('/tasks?completed=false').data)
+    assert [task['id'] for task in data['tasks']] == [2]
+    response = client.get('/tasks?completed=banana')
+    assert response.status_code == 400
+    assert orjson.loads(response.data)['error'] == 'completed must be true or false'
+
 def test_get_single_task(client):
     """Test get single task"""
     response = client.get('/tasks/1')
     assert response.status_code == 200
-    data = json.loads(response.data)
+    data = orjson.loads(response.data)
     assert data['id'] == 1
     assert 'title' in data
 
+def test_get_tasks_etag(client):
+    """Test repeated reads with a matching ETag get 304 Not Modified"""
+    response = client.get('/tasks')
+    etag = response.headers['ETag']
+    response = client.get('/tasks', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    response = client.head('/tasks/1')
+    assert response.headers['ETag'] == client.get('/tasks/1').headers['ETag']
+
+def test_stale_cache_entry_not_served(client):
+    """Test a read that raced a write can't serve its old body afterwards"""
+    old_key = app_module._tasks_cache_key()
+    stale = app.response_class(client.get('/tasks').data, mimetype='application/json')
+    client.post('/tasks', json={'title': 'Newer Task'})
+    # A slow reader from before the write stores its body late
+    app_module.cache.set(old_key, stale)
+    data = orjson.loads(client.get('/tasks').data)
+    assert data['count'] == 3
+
 def test_get_nonexistent_task(client):
     """Test get non-existent task"""
     response = client.get('/tasks/999')
     assert response.status_code == 404
-    data = json.loads(response.data)
+    data = orjson.loads(response.data)
     assert data['error'] == 'Task not found'
 
 def test_create_task(client):
@@ -68,11 +141,60 @@ def test_create_task(client):
                           data=json.dumps(new_task),
                           content_type='application/json')
     assert response.status_code == 201
-    data = json.loads(response.data)
+    data = orjson.loads(response.data)
     assert data['title'] == new_task['title']
     assert data['description'] == new_task['description']
     assert data['completed'] == False
     assert 'id' in data
+    response = client.get(f"/tasks/{data['id']}")
+    assert response.status_code == 200
+
+def test_concurrent_create_tasks(client):
+    """Test concurrent creates each get their own task ID"""
+    ids = []
+    def create():
+        for _ in range(20):
+            response = app.test_client().post('/tasks', json={'title': 'Concurrent Task'})
+            ids.append(orjson.loads(response.data)['id'])
+    threads = [threading.Thread(target=create) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(ids)) == 80
+    assert orjson.loads(client.get('/tasks').data)['count'] == 82
+
+def test_consistent_reads_during_writes(client):
+    """Test readers never see tasks and the completed index out of step"""
+    done = threading.Event()
+    errors = []
+    def write():
+        try:
+            writer = app.test_client()
+            for _ in range(50):
+                response = writer.post('/tasks', json={'title': 'Churn'})
+                task_id = orjson.loads(response.data)['id']
+                writer.put(f'/tasks/{task_id}', json={'completed': True})
+                writer.put('/tasks/1', json={'completed': True})
+                writer.put('/tasks/1', json={'completed': False})
+                writer.delete(f'/tasks/{task_id}')
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.set()
+    thread = threading.Thread(target=write, daemon=True)
+    thread.start()
+    reader = app.test_client()
+    deadline = time.monotonic() + 30
+    while not done.is_set():
+        assert time.monotonic() < deadline, 'writer did not finish'
+        data = orjson.loads(reader.get('/metrics').data)
+        assert data['pending_tasks'] >= 0
+        assert data['completed_tasks'] <= data['total_tasks']
+        data = orjson.loads(reader.get('/tasks?completed=true').data)
+        assert all(task['completed'] for task in data['tasks'])
+    thread.join(timeout=5)
+    assert errors == []
 
 def test_create_task_missing_title(client):
     """Test create task without title"""
@@ -83,7 +205,16 @@ def test_create_task_missing_title(client):
                           data=json.dumps(new_task),
                           content_type='application/json')
     assert response.status_code == 400
-    data = json.loads(response.data)
+    data = orjson.loads(response.data)
+    assert data['error'] == 'Title is required'
+
+def test_create_task_malformed_json(client):
+    """Test create task with a body that isn't valid JSON"""
+    response = client.post('/tasks',
+                          data='{"title": ',
+                          content_type='application/json')
+    assert response.status_code == 400
+    data = orjson.loads(response.data)
     assert data['error'] == 'Title is required'
 
 def test_update_task(client):
@@ -96,7 +227,7 @@ def test_update_task(client):
                          data=json.dumps(update_data),
                          content_type='application/json')
     assert response.status_code == 200
-    data = json.loads(response.data)
+    data = orjson.loads(response.data)
     assert data['title'] == update_data['title']
     assert data['completed'] == update_data['completed']
 
@@ -109,38 +240,103 @@ def test_update_nonexistent_task(client):
                          data=json.dumps(update_data),
                          content_type='application/json')
     assert response.status_code == 404
-    data = json.loads(response.data)
+    data = orjson.loads(response.data)
     assert data['error'] == 'Task not found'
 
 def test_delete_task(client):
     """Test delete task"""
     response = client.delete('/tasks/2')
     assert response.status_code == 200
-    data = json.loads(response.data)
+    data = orjson.loads(response.data)
     assert 'message' in data
     assert 'deleted successfully' in data['message']
 
+def test_get_deleted_task(client):
+    """Test deleted task can no longer be fetched"""
+    client.delete('/tasks/2')
+    response = client.get('/tasks/2')
+    assert response.status_code == 404
+    data = orjson.loads(response.data)
+    assert data['error'] == 'Task not found'
+
 def test_delete_nonexistent_task(client):
     """Test delete non-existent task"""
     response = client.delete('/tasks/999')
     assert response.status_code == 404
-    data = json.loads(response.data)
+    data = orjson.loads(response.data)
     assert data['error'] == 'Task not found'
 
 def test_metrics_endpoint(client):
     """Test metrics endpoint"""
     response = client.get('/metrics')
     assert response.status_code == 200
-    data = json.loads(response.data)
+    data = orjson.loads(response.data)
     assert 'total_tasks' in data
     assert 'completed_tasks' in data
     assert 'pending_tasks' in data
     assert 'timestamp' in data
     assert isinstance(data['total_tasks'], int)
+    assert data['completed_tasks'] + data['pending_tasks'] == data['total_tasks']
+
+def test_metrics_track_completion(client):
+    """Test metrics counters follow task completion changes"""
+    before = orjson.loads(client.get('/metrics').data)
+    response = client.post('/tasks',
+                          data=json.dumps({'title': 'Metrics Task'}),
+                          content_type='application/json')
+    task_id = orjson.loads(response.data)['id']
+    client.put(f'/tasks/{task_id}',
+               data=json.dumps({'completed': True}),
+               content_type='application/json')
+    data = orjson.loads(client.get('/metrics').data)
+    assert data['completed_tasks'] == before['completed_tasks'] + 1
+    assert data['pending_tasks'] == before['pending_tasks']
+    client.delete(f'/tasks/{task_id}')
+    data = orjson.loads(client.get('/metrics').data)
+    assert data['completed_tasks'] == before['completed_tasks']
+    assert data['total_tasks'] == before['total_tasks']
+
+def test_state_reset_between_tests(client):
+    """Test task changes from earlier tests have been rolled back"""
+    data = orjson.loads(client.get('/tasks/1').data)
+    assert data['title'] == 'Learn Docker'
+    assert data['completed'] == False
+    assert orjson.loads(client.get('/tasks').data)['count'] == 2
 
 def test_404_endpoint(client):
     """Test 404 error handling"""
     response = client.get('/nonexistent')
     assert response.status_code == 404
-    data = json.loads(response.data)
-    assert data['error'] == 'Endpoint not found'
\ No newline at end of file
+    data = orjson.loads(response.data)
+    assert data['error'] == 'Endpoint not found'
+    for path in ['/tasks/abc', '/tasks/1/extra']:
+        response = client.get(path)
+        assert response.status_code == 404
+        assert orjson.loads(response.data)['error'] == 'Endpoint not found'
+
+def test_batch_write_listener():
+    """Test queued log records are written out in order"""
+    read_fd, write_fd = os.pipe()
+    log_queue = queue.SimpleQueue()
+    listener = BatchWriteListener(log_queue, write_fd, logging.Formatter('%(message)s'))
+    for i in range(3):
+        log_queue.put(logging.makeLogRecord({'msg': 'line %d', 'args': (i,)}))
+    listener.start()
+    listener.stop()
+    os.close(write_fd)
+    with os.fdopen(read_fd, 'rb') as pipe:
+        assert pipe.read() == b'line 0\nline 1\nline 2\n'
+
+def test_batch_write_listener_survives_bad_record(capsys):
+    """Test a record that fails to format is reported and later records still get written"""
+    read_fd, write_fd = os.pipe()
+    log_queue = queue.SimpleQueue()
+    listener = BatchWriteListener(log_queue, write_fd, logging.Formatter('%(message)s'))
+    listener.start()
+    log_queue.put(logging.makeLogRecord({'msg': 'bad %d', 'args': ('x',)}))
+    log_queue.put(logging.makeLogRecord({'msg': 'good'}))
+    listener.stop()
+    os.close(write_fd)
+    with os.fdopen(read_fd, 'rb') as pipe:
+        assert pipe.read() == b'good\n'
+    assert 'Logging error' in capsys.readouterr().err